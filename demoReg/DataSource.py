@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+File: DataSource.py
+Purpose: Uniform column access for DesignMat over pandas DataFrames and
+         (when pyarrow is installed) Arrow tables, record batch readers,
+         Polars DataFrames, and columns read from Parquet files
+Author: H. Seltman
+Date: Oct. 2026
+
+Arrow numeric columns with a single chunk and no nulls are read without
+copying.  Factors are returned as (values, codes) pairs, so that text
+cleanup is done once per distinct value rather than once per row; Arrow
+dictionary columns supply these directly.
+"""
+import sys
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+def formula_variables(formula):
+    """ The DV followed by the IVs of a formula such as "y~x1+x2" """
+    formula = formula.replace(" ", "")
+    tilde = formula.find("~")
+    if tilde == -1:
+        raise(Exception("No tilde in formula"))
+    return [formula[:tilde]] + formula[tilde + 1:].split('+')
+
+
+def as_data(data):
+    """
+    Return a pandas DataFrame or pyarrow Table holding 'data'.
+    DataFrames and Tables are returned as is; record batches and record
+    batch readers are gathered into a Table (without copying the
+    batches), and Polars DataFrames are converted with to_arrow().
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    if pa is not None:
+        if isinstance(data, pa.Table):
+            return data
+        if isinstance(data, pa.RecordBatchReader):
+            return data.read_all()
+        if isinstance(data, pa.RecordBatch):
+            return pa.Table.from_batches([data])
+        if 'polars' in sys.modules and \
+                isinstance(data, sys.modules['polars'].DataFrame):
+            return data.to_arrow()
+    raise(TypeError("'data' must be a pandas 'DataFrame' or a pyarrow " +
+                    "'Table', 'RecordBatch', or 'RecordBatchReader' or " +
+                    "a polars 'DataFrame' (requires pyarrow)"))
+
+
+def is_arrow(data):
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def column_names(data):
+    if is_arrow(data):
+        return data.column_names
+    return list(data.columns)
+
+
+def row_index(data):
+    """ Row labels: the DataFrame index, or positions for Arrow """
+    if is_arrow(data):
+        return pd.RangeIndex(data.num_rows)
+    return data.index
+
+
+def is_numeric(data, var):
+    """ Is column 'var' coded as a number (rather than as a factor)?
+        Integers and floats of any width are numbers; bool is a factor.
+    """
+    if is_arrow(data):
+        t = data.column(var).type
+        return pa.types.is_floating(t) or pa.types.is_integer(t)
+    dtype = data[var].dtype
+    return pd.api.types.is_numeric_dtype(dtype) and \
+        not pd.api.types.is_bool_dtype(dtype)
+
+
+def isna(data, var):
+    """ Boolean numpy array that is True where 'var' is missing """
+    if is_arrow(data):
+        return pc.is_null(data.column(var), nan_is_null=True).to_numpy()
+    return pd.isna(data[var]).to_numpy()
+
+
+def numeric(data, var):
+    """
+    Numeric column 'var' as a 1-D numpy array (in its own dtype, with
+    NaN for missing values).  Arrow columns without nulls that have a
+    single chunk are returned as a read-only view of the Arrow buffer.
+    """
+    if is_arrow(data):
+        col = data.column(var)
+        if col.num_chunks == 1 and col.null_count == 0:
+            return col.chunk(0).to_numpy(zero_copy_only=True)
+        return col.to_numpy()
+    return data[var].to_numpy()
+
+
+def factor(data, var):
+    """
+    Factor column 'var' as (values, codes): 'values' is a numpy object
+    array of distinct values and 'codes' is an integer numpy array with
+    data[var][i] == values[codes[i]], and -1 for missing values.
+    """
+    if not is_arrow(data):
+        codes, values = pd.factorize(data[var])
+        return np.asarray(values, dtype=object), codes
+    col = data.column(var)
+    if not pa.types.is_dictionary(col.type):
+        col = pc.dictionary_encode(col)
+    col = pa.Table.from_arrays([col], [var]).unify_dictionaries().column(0)
+    if col.num_chunks == 0:
+        return np.array([], dtype=object), np.array([], dtype=int)
+    values = col.chunk(0).dictionary.to_numpy(zero_copy_only=False)
+    # Indices may be unsigned (e.g. Polars Categorical), so widen before
+    # using -1 for missing
+    codes = [c.indices.cast(pa.int64()).fill_null(-1).to_numpy()
+             for c in col.chunks]
+    return np.asarray(values, dtype=object), np.concatenate(codes)
+
+
+def read_parquet(path, formula, row_groups=None, stream=False):
+    """
+    Read only the columns used in 'formula' from a Parquet file.  String
+    columns are kept dictionary encoded, so DesignMat uses their codes
+    directly.  'row_groups' optionally lists the row groups to read (all
+    by default).  The result is a pyarrow Table, or with 'stream' a
+    RecordBatchReader that reads one row group at a time; Reg and
+    DesignMat gather its batches without copying them, since X is built
+    from every row at once.
+    """
+    if pa is None:
+        raise(ImportError("read_parquet() requires pyarrow"))
+    names = formula_variables(formula)
+    # read_dictionary only affects string/binary columns
+    pf = pq.ParquetFile(path, read_dictionary=names)
+    for var in names:
+        if var not in pf.schema_arrow.names:
+            raise(Exception("'" + var + "' from 'formula' not in '" +
+                            str(path) + "'"))
+    if row_groups is None:
+        row_groups = range(pf.num_row_groups)
+    if not stream:
+        return pf.read_row_groups(row_groups, columns=names)
+
+    def batches():
+        for i in row_groups:
+            yield from pf.read_row_group(i, columns=names).to_batches()
+
+    schema = pa.schema([pf.schema_arrow.field(var) for var in names])
+    return pa.RecordBatchReader.from_batches(schema, batches())
@@ -8,13 +8,34 @@ Date: Dec. 2017
 """
 import numpy as np
 import pandas as pd
+from demoReg import DataSource
+
+
+NA_ACTIONS = ('complete', 'error', 'level')
+
+
+def clean_factor(x, strip=True, toupper=True, tolower=False):
+    """ Convert the values of a factor to cleaned up 'str' levels
+        (missing values become "nan" before any case conversion)
+    """
+    x = pd.Series(np.asarray(x, dtype=object))
+    x[x.isna()] = "nan"
+    x = x.astype(str)
+    if strip:
+        x = x.str.strip()
+    if toupper:
+        x = x.str.upper()
+    if tolower:
+        x = x.str.lower()
+    return x.to_numpy()
 
 
 class DesignMat():
     """
     Convert formula and DataFrame to a design matrix
     Input: 'formula' is a str of the form "y~x1+x2"
-           'data' is a DataFrame containing all of the variables
+           'data' is a DataFrame (or an Arrow table or Polars DataFrame,
+             see DataSource.as_data()) containing all of the variables
              in 'formula'
     Limitations: formula RHS is "+" between numeric or categorical variables
     Implementation details:
@@ -22,15 +43,20 @@ class DesignMat():
         2) non-numeric columns are coded as factors using "treatment"
            contrasts with the baseline as the alphabetically first level or
            a level set with set_custom_baseline() or set_custom_baselines()
+        3) rows with missing values are dropped, or cause an error, or
+           (for factors) are coded as the level "nan" (after the case
+           conversions, so "NAN" by default), according to set_na_action()
     Usage: First set custom baseline(s) and strip, tolower, & toupper, and
            then run make_X() which constructs 'X'.
-    Goal: compute DesignMatrix.X, supplemented by DesignMatrix.baseline,
-          and DesignMatrix.levels.
+    Goal: compute DesignMatrix.X and DesignMatrix.y, supplemented by
+          DesignMatrix.baseline, DesignMatrix.levels, and the missing
+          value mask DesignMatrix.keep.
     """
 
-    def __init__(self, formula, data):
+    def __init__(self, formula, data, na_action='complete'):
         self.formula = formula.replace(" ", "")
-        self.data = data
+        self.data = DataSource.as_data(data)
+        self.columns = DataSource.column_names(self.data)
         self.nrow, self.ncol = self.data.shape
         self.extract_DV()
         self.extract_IVs()
@@ -41,7 +67,10 @@ class DesignMat():
         self.baselines = {}
         self.levels = None
         self.max_levels_shown = 10
+        self.set_na_action(na_action)
+        self.keep = None
         self.X = None
+        self.y = None
 
     def __repr__(self):
         return "DesignMatrix({0}, Data: {1} x {2})".format(
@@ -53,7 +82,7 @@ class DesignMat():
         if tilde == -1:
             raise(Exception("No tilde in formula"))
         self.DV = self.formula[:tilde]
-        if self.DV not in self.data.columns:
+        if self.DV not in self.columns:
             raise(Exception("DV from 'formula' not in 'data'"))
 
     def extract_IVs(self):
@@ -64,7 +93,7 @@ class DesignMat():
         RHS = self.formula[tilde + 1:]
         IVs = [x.strip() for x in RHS.split('+')]
         for iv in IVs:
-            if iv not in self.data.columns:
+            if iv not in self.columns:
                 raise(Exception("'" + iv + "' from 'formula' not in 'data'"))
         self.IVs = IVs
 
@@ -111,55 +140,133 @@ class DesignMat():
             raise(TypeError("'value' must be a 'bool' object"))
         self.toupper = value
 
-    def recode(self, var):
-        """ Recode from Series to numpy array
+    def set_na_action(self, value):
+        """
+        Choose how missing values (NaN/None) in the DV and IVs are handled:
+          'complete': drop any row with a missing value (the default)
+          'error': raise ValueError if any value is missing
+          'level': missing factor values become the level "nan", which
+                   follows the strip/toupper/tolower settings (so it is
+                   "NAN" by default); rows with missing numeric values are
+                   still dropped
+        """
+        if value not in NA_ACTIONS:
+            raise(ValueError("'value' must be one of " + str(NA_ACTIONS)))
+        self.na_action = value
+
+    def is_numeric(self, var):
+        """ Is 'var' coded as a number (rather than as a factor)? """
+        return DataSource.is_numeric(self.data, var)
+
+    def make_mask(self):
+        """
+        Combine the missing value checks for the DV and IVs into one
+        boolean row mask, 'keep'.  Also sets 'nobs', 'n_dropped', and
+        'dropped_index' (the DataFrame index of the dropped rows).
+        """
+        keep = np.ones(self.nrow, dtype=bool)
+        missing = {}
+        for var in [self.DV] + self.IVs:
+            if self.na_action == 'level' and not self.is_numeric(var):
+                continue
+            na = DataSource.isna(self.data, var)
+            if na.any():
+                missing[var] = int(na.sum())
+                keep &= ~na
+        if missing and self.na_action == 'error':
+            raise(ValueError("missing values found: " +
+                             ", ".join("'" + k + "' (" + str(v) + ")"
+                                       for (k, v) in missing.items())))
+        if not keep.any():
+            raise(ValueError("every row has a missing value"))
+        self.keep = keep
+        self.nobs = int(keep.sum())
+        self.n_dropped = self.nrow - self.nobs
+        self.dropped_index = DataSource.row_index(self.data)[~keep]
+
+    def masked(self, values):
+        """ Rows of numpy array 'values' that are in 'keep' """
+        if self.n_dropped == 0:
+            return values
+        return values[self.keep]
+
+    def factor_codes(self, var):
+        """ Find the baseline and other levels of factor 'var' (from the
+            rows in 'keep') and return its integer codes, where -1 is the
+            baseline and i is level self.levels[var][i]
+        """
+        values, codes = DataSource.factor(self.data, var)
+        # Clean each distinct value once; code -1 (missing) picks the
+        # appended None
+        values = clean_factor(np.append(values, None),
+                              self.strip, self.toupper, self.tolower)
+        codes = self.masked(codes)
+        names = sorted(set(values[np.unique(codes)]))
+        if self.baselines.get(var) is None:
+            self.baselines[var] = names[0]
+        elif self.baselines[var] not in names:
+            print("Baseline '", self.baselines[var], "' is not in '",
+                  var, "'.", sep="")
+            self.baselines[var] = names[0]
+            print("Using '", self.baselines[var], "' instead.", sep="")
+        names.remove(self.baselines[var])
+        self.levels[var] = names
+        return pd.Index(names).get_indexer(values)[codes]
+
+    def reset_coding(self):
+        """ Start coding afresh from the custom baselines and a new
+            missing value mask
+        """
+        self.baselines = dict(self.custom_baselines)
+        self.levels = {}
+        self.make_mask()
+
+    def recode(self, var, codes=None, out=None):
+        """ Recode from Series to numpy array (rows in 'keep' only)
             float is unchanged
             int is converted to float
-            others are treated as factors
+            others are treated as factors ('codes' from factor_codes()
+              may be passed to avoid recomputing them)
+            The result is written into 'out' if it is given; otherwise
+            recode() is being called on its own and builds a fresh
+            missing value mask first.
         """
-        if self.data[var].dtype in ('float32', 'float64'):
-            return self.data[var].as_matrix().reshape(self.nrow, 1)
-        elif self.data[var].dtype in ('int', 'int64'):
-            return self.data[var].astype(float).as_matrix().\
-                reshape(self.nrow, 1)
-        # Code factors (categorical IVs)
-        else:
-            x = [str(v) for v in self.data[var]]
-            if self.strip:
-                x = [v.strip() for v in x]
-            if self.toupper:
-                x = [v.upper() for v in x]
-            if self.tolower:
-                x = [v.lower() for v in x]
-            if self.baselines.get(var) is None:
-                self.baselines[var] = min(x)
-            elif self.baselines[var] not in x:
-                print("Baseline '", self.baselines[var], "' is not in '",
-                      var, "'.", sep="")
-                self.baselines[var] = min(x)
-                print("Using '", self.baselines[var], "' instead.", sep="")
-
-            cnts = pd.Series(x).value_counts()
-            names = sorted(cnts.index)
-            temp = names.copy()
-            temp.remove(self.baselines[var])
-            self.levels[var] = temp
-            X = np.full((self.nrow, len(cnts) - 1), np.nan)
-            offset = 0
-            for i in range(len(cnts)):
-                if names[i] == self.baselines[var]:
-                    offset = -1
-                    next
-                X[:, i + offset] = [int(v == names[i]) for v in x]
-            return(X)
+        if out is None:
+            if self.levels is None:
+                self.reset_coding()
+            else:
+                self.make_mask()
+        if self.is_numeric(var):
+            if out is None:
+                out = np.empty((self.nobs, 1))
+            out[:, 0] = self.masked(DataSource.numeric(self.data, var))
+            return out
+        if codes is None:
+            codes = self.factor_codes(var)
+        n = len(self.levels[var])
+        if out is None:
+            out = np.empty((self.nobs, n))
+        out[:] = codes[:, None] == np.arange(n)
+        return out
 
     def make_X(self):
-        """ Make design matrix (numpy array) X from IVs """
-        self.baselines = self.custom_baselines
-        self.levels = {}
-        self.X = np.ones((self.nrow, 1))
-        for iv in self.IVs:
-            self.X = np.concatenate((self.X, self.recode(iv)), 1)
+        """ Make design matrix (numpy array) X from IVs, and the matching
+            DV values 'y', using only the rows in the missing value mask
+        """
+        self.reset_coding()
+        # Factor levels are needed first to size X
+        codes = {iv: self.factor_codes(iv) for iv in self.IVs
+                 if not self.is_numeric(iv)}
+        width = [len(self.levels[iv]) if iv in codes else 1
+                 for iv in self.IVs]
+        self.X = np.empty((self.nobs, 1 + sum(width)))
+        self.X[:, 0] = 1.0
+        col = 1
+        for (iv, n) in zip(self.IVs, width):
+            self.recode(iv, codes.get(iv), self.X[:, col:col + n])
+            col += n
+        self.y = np.asarray(
+            self.masked(DataSource.numeric(self.data, self.DV)), dtype=float)
 
     def show_factor_info(self):
         if self.X is None:
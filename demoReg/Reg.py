@@ -8,6 +8,8 @@ Created on Wed Dec 20 09:13:51 2017
 
 import pandas as pd
 from demoReg import DesignMatrix
+from demoReg import RegIO
+from demoReg import DataSource
 import numpy as np
 import scipy.stats as ss
 # import logLike
@@ -16,6 +18,9 @@ import scipy.stats as ss
 class Reg:
     """
     Perform regression from an R-style formula and a pandas DataFrame.
+    Arrow tables, record batch readers, and Polars DataFrames are also
+    accepted (see DataSource.as_data()); use DataSource.read_parquet() to
+    read just the formula's columns from a Parquet file.
 
     Use a DesignMatrix class object to compute the design matrix.
 
@@ -28,18 +33,17 @@ class Reg:
     formulas.
     """
 
-    def __init__(self, formula, data):
-        """ Check and store inputs"""
+    def __init__(self, formula, data, na_action='complete'):
+        """ Check and store inputs.  See DesignMat.set_na_action() for
+            'na_action'.
+        """
         if not isinstance(formula, str):
             raise(TypeError("'formula' must be a 'str'"))
         self.formula = formula.replace(" ", "")
-        if not isinstance(data, pd.core.frame.DataFrame):
-            raise(TypeError("'data' must be a pandas 'DataFrame'"))
-        self.data = data
-        self.nrow = len(data)
-        self.ncol = data.shape[1]
+        self.data = DataSource.as_data(data)
+        self.nrow, self.ncol = self.data.shape
         self.DesignMat = DesignMatrix.DesignMat(self.formula,
-                                                self.data)
+                                                self.data, na_action)
 
         # get DV and IVs
         self.DV = self.DesignMat.DV
@@ -68,7 +72,11 @@ class Reg:
         """ Based on current settings of DesignMatrix, compute 'X' """
         self.DesignMat.make_X()
         self.X = self.DesignMat.X
+        self.y = self.DesignMat.y
         self.p = self.X.shape[1]
+        self.nobs = self.DesignMat.nobs
+        self.n_dropped = self.DesignMat.n_dropped
+        self.dropped_index = self.DesignMat.dropped_index
 
     def fit(self):
         """ Fit the model from 'X' and the DV.  Store results in  'bhat' and
@@ -76,7 +84,7 @@ class Reg:
         """
         self.make_X()
         vcov_unadj = np.linalg.inv(self.X.T @ self.X)
-        bhat = vcov_unadj @ self.X.T @ self.data[self.DV].values
+        bhat = vcov_unadj @ self.X.T @ self.y
         bnames = ['Intercept']
         for iv in self.IVs:
             if iv in self.DesignMat.levels:
@@ -85,10 +93,10 @@ class Reg:
             else:
                 bnames = bnames + [iv]
         self.bhat = pd.DataFrame({'estimate': bhat}, index=bnames)
-        self.fitted = (self.X @ self.bhat).flatten()
-        self.residual = self.data[self.DV].values - self.fitted
+        self.fitted = self.X @ bhat
+        self.residual = self.y - self.fitted
         self.SSR = sum([r*r for r in self.residual])
-        self.df = self.nrow - self.p
+        self.df = self.nobs - self.p
         self.se_residual = (self.SSR / self.df)**0.5
         self.vcov = vcov_unadj * self.se_residual * self.se_residual
         self.bhat = pd.concat((self.bhat,
@@ -105,6 +113,13 @@ class Reg:
                                          name='p_value', index=bnames)),
                               axis=1)
 
+    def save(self, path, arrays=()):
+        """ Save a slim, memory-mappable copy of the fitted model to 'path'.
+            Load it with demoReg.RegIO.load_model().  See RegIO.save_model()
+            for 'arrays'.
+        """
+        RegIO.save_model(self, path, arrays)
+
 
 if __name__ == "__main__":
     dat = pd.DataFrame({'age': [25, 30, 35, 40],
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+File: RegIO.py
+Purpose: Save a fitted Reg object as a slim, pickle-free binary artifact
+         and load it back (memory-mapped) for scoring
+Author: H. Seltman
+Date: Oct. 2026
+
+File layout (all integers little-endian):
+    bytes 0-7    magic b"DEMOREG\\0"
+    bytes 8-11   uint32 format version
+    bytes 12-19  uint64 length of the UTF-8 JSON header
+    header       JSON: model schema plus, for each array, its name,
+                 dtype, shape and byte offset from the start of the file
+    arrays       raw C-order data, each starting on a 64 byte boundary
+"""
+import json
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import numpy as np
+import pandas as pd
+import scipy.stats as ss
+from demoReg import DataSource
+from demoReg.DesignMatrix import clean_factor
+
+
+MAGIC = b"DEMOREG\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+OPTIONAL_ARRAYS = ('X', 'fitted', 'residual')
+_PREAMBLE = struct.Struct("<8sIQ")
+
+
+def _aligned(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def _file_mode(path):
+    """ Mode of existing file 'path', or else 0666 less the umask """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def save_model(reg, path, arrays=()):
+    """
+    Write the fitted Reg object 'reg' to 'path'.
+    Always stored: coefficient estimates, vcov, and the encoder schema
+    (IVs, factor levels and baselines, and strip/toupper/tolower flags).
+    'arrays' optionally names large arrays to include, chosen from
+    'X', 'fitted', and 'residual'.  The training data are never stored.
+    """
+    if getattr(reg, 'bhat', None) is None:
+        raise(Exception("'reg' has not been fit; run .fit() first"))
+    if isinstance(arrays, str):
+        arrays = (arrays,)
+    for name in arrays:
+        if name not in OPTIONAL_ARRAYS:
+            raise(ValueError("'arrays' entries must be in " +
+                             str(OPTIONAL_ARRAYS)))
+    dm = reg.DesignMat
+    data = {'estimate': reg.bhat['estimate'].values,
+            'vcov': reg.vcov}
+    for name in arrays:
+        data[name] = getattr(reg, name)
+    data = {k: np.ascontiguousarray(v, dtype='<f8')
+            for (k, v) in data.items()}
+
+    header = {'formula': reg.formula,
+              'DV': reg.DV,
+              'IVs': reg.IVs,
+              'bnames': list(reg.bhat.index),
+              'levels': dm.levels,
+              'baselines': {k: dm.baselines[k] for k in dm.levels},
+              'strip': dm.strip,
+              'toupper': dm.toupper,
+              'tolower': dm.tolower,
+              'nrow': reg.nrow,
+              'nobs': reg.nobs,
+              'df': reg.df,
+              'SSR': float(reg.SSR),
+              'se_residual': float(reg.se_residual),
+              'arrays': []}
+    # Offsets depend on the header length, so size the header with
+    # placeholder offsets first; real offsets are never longer than
+    # the padding allowed for below.
+    specs = [{'name': k, 'dtype': v.dtype.str, 'shape': list(v.shape),
+              'offset': 0} for (k, v) in data.items()]
+    header['arrays'] = specs
+    room = len(json.dumps(header).encode()) + 20 * len(specs)
+    offset = _aligned(_PREAMBLE.size + room)
+    for spec in specs:
+        spec['offset'] = offset
+        offset = _aligned(offset + data[spec['name']].nbytes)
+    text = json.dumps(header).encode()
+    text = text + b" " * (room - len(text))
+
+    # Write a new file and rename it over 'path', so that processes with
+    # the old file memory-mapped keep reading the old contents.
+    path = os.fspath(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix=os.path.basename(path) + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(text)))
+            f.write(text)
+            for spec in specs:
+                f.write(b"\0" * (spec['offset'] - f.tell()))
+                f.write(memoryview(data[spec['name']]).cast("B"))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp() uses mode 0600; give the file the mode open() would
+        # (or keep the mode of the model being replaced) so that scoring
+        # processes run by other users can still read it
+        os.chmod(tmp, _file_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_model(path, use_mmap=True):
+    """
+    Read a file written by save_model() and return a FittedModel.
+    With 'use_mmap' (the default) the arrays are read-only views of a
+    shared memory map of the file, so many processes loading the same
+    model share one copy in the page cache.
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+    if len(buf) < _PREAMBLE.size:
+        raise(ValueError("'" + str(path) + "' is not a demoReg model file"))
+    magic, version, hlen = _PREAMBLE.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise(ValueError("'" + str(path) + "' is not a demoReg model file"))
+    if version > FORMAT_VERSION:
+        raise(ValueError("model file version " + str(version) +
+                         " is newer than supported version " +
+                         str(FORMAT_VERSION)))
+    start = _PREAMBLE.size
+    header = json.loads(bytes(buf[start:start + hlen]).decode())
+    arrays = {}
+    for spec in header.pop('arrays'):
+        shape = tuple(spec['shape'])
+        count = int(np.prod(shape))
+        arrays[spec['name']] = np.frombuffer(
+            buf, dtype=np.dtype(spec['dtype']), count=count,
+            offset=spec['offset']).reshape(shape)
+    return FittedModel(header, arrays)
+
+
+class FittedModel():
+    """
+    Slim fitted regression model, as returned by load_model()
+    Holds 'bhat' (estimates with se, t, and p_value), 'vcov', the encoder
+    schema needed to build X for new data, and any optional arrays
+    ('X', 'fitted', 'residual') that were saved.  Use predict() to score.
+    """
+
+    def __init__(self, header, arrays):
+        self.formula = header['formula']
+        self.DV = header['DV']
+        self.IVs = header['IVs']
+        self.levels = header['levels']
+        self.baselines = header['baselines']
+        self.strip = header['strip']
+        self.toupper = header['toupper']
+        self.tolower = header['tolower']
+        self.nrow = header['nrow']
+        self.nobs = header.get('nobs', self.nrow)
+        self.df = header['df']
+        self.SSR = header['SSR']
+        self.se_residual = header['se_residual']
+        self.bnames = header['bnames']
+        self.estimate = arrays.pop('estimate')
+        self.vcov = arrays.pop('vcov')
+        self.p = len(self.estimate)
+        self.X = arrays.get('X')
+        self.fitted = arrays.get('fitted')
+        self.residual = arrays.get('residual')
+
+    def __repr__(self):
+        return "FittedModel({0}, {1} coefficients)".format(
+            self.formula, self.p)
+
+    @property
+    def bhat(self):
+        """ Coefficient table matching Reg.bhat """
+        se = np.sqrt(np.diag(self.vcov))
+        t = self.estimate / se
+        return pd.DataFrame({'estimate': self.estimate, 'se': se, 't': t,
+                             'p_value': (1 - ss.t.cdf(abs(t), self.df)) * 2},
+                            index=self.bnames)
+
+    def make_X(self, data):
+        """ Encode the IVs of 'data' with the saved schema.  Rows with a
+            missing value in any IV, or a factor value not seen in fitting,
+            are all NaN (and so have NaN predictions).
+        """
+        data = DataSource.as_data(data)
+        columns = DataSource.column_names(data)
+        for iv in self.IVs:
+            if iv not in columns:
+                raise(Exception("'" + iv + "' from 'formula' not in 'data'"))
+        X = np.empty((data.shape[0], self.p))
+        X[:, 0] = 1.0
+        bad = np.zeros(data.shape[0], dtype=bool)
+        col = 1
+        for iv in self.IVs:
+            if iv not in self.levels:
+                x = DataSource.numeric(data, iv)
+                na = DataSource.isna(data, iv)
+                if na.any():
+                    bad |= na
+                    x = np.where(na, np.nan, x)
+                X[:, col] = x
+                col += 1
+                continue
+            values, codes = DataSource.factor(data, iv)
+            # Missing values clean to "nan", which is only known if the
+            # model was fit with na_action 'level'
+            x = clean_factor(np.append(values, None), self.strip,
+                             self.toupper, self.tolower)
+            level = pd.Index(self.levels[iv]).get_indexer(x)
+            unseen = (level == -1) & (x != self.baselines[iv])
+            bad |= unseen[codes]
+            codes = level[codes]
+            n = len(self.levels[iv])
+            X[:, col:col + n] = codes[:, None] == np.arange(n)
+            col += n
+        X[bad] = np.nan
+        return X
+
+    def predict(self, data):
+        """ Predicted DV values for the rows of 'data' (NaN for rows
+            with missing or unseen IV values; see make_X())
+        """
+        return self.make_X(data) @ self.estimate
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Unit testing of Arrow, Polars, and Parquet input
+@author: hseltman
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from demoReg.DesignMatrix import DesignMat
+from demoReg.Reg import Reg
+from demoReg import DataSource
+
+pa = pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def simpleData():
+    """ simple data frame fixture """
+    dat = pd.DataFrame({'age': [25, 30, 35, 40, 45],
+                        'male': ['m', 'M', 'f ', 'F', None],
+                        'tx': ['p', 'p', 'a', 'a', 'b'],
+                        'score': [45.0, 52.0, 88.0, 51.0, 60.0]})
+    return(dat)
+
+
+def test_arrow_matches_pandas(simpleData):
+    """Does an Arrow table give the same X and levels as pandas?"""
+    dm = DesignMat("score ~ age + male + tx", simpleData)
+    dm.make_X()
+    table = pa.Table.from_pandas(simpleData, preserve_index=False)
+    da = DesignMat("score ~ age + male + tx", table)
+    da.make_X()
+    assert np.array_equal(da.X, dm.X)
+    assert np.array_equal(da.y, dm.y)
+    assert da.levels == dm.levels
+    assert list(da.dropped_index) == [4]
+
+
+def test_dictionary_factor(simpleData):
+    """Are dictionary-encoded chunks used as factor codes?"""
+    table = pa.Table.from_pandas(simpleData, preserve_index=False)
+    chunks = [table.slice(0, 2), table.slice(2)]
+    table = pa.concat_tables(chunks).cast(pa.schema(
+        [f if f.name != 'tx' else pa.field('tx', pa.dictionary(
+            pa.int32(), pa.string())) for f in table.schema]))
+    values, codes = DataSource.factor(table, 'tx')
+    assert list(values[codes]) == list(simpleData['tx'])
+    dm = DesignMat("score ~ tx", table)
+    dm.make_X()
+    assert dm.levels == {'tx': ['B', 'P']}
+
+
+def test_numeric_zero_copy(simpleData):
+    """Is a single chunk numeric column read without copying?"""
+    table = pa.Table.from_pandas(simpleData, preserve_index=False)
+    x = DataSource.numeric(table, 'score')
+    assert not x.flags.writeable
+    assert x.ctypes.data == table.column('score').chunk(0).buffers()[1].address
+
+
+def test_reader_and_polars(simpleData):
+    """Are record batch readers and Polars frames accepted by Reg?"""
+    table = pa.Table.from_pandas(simpleData, preserve_index=False)
+    r0 = Reg("score ~ age + tx", simpleData)
+    r0.fit()
+    r = Reg("score ~ age + tx", pa.RecordBatchReader.from_batches(
+        table.schema, table.to_batches()))
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    pl = pytest.importorskip("polars")
+    r = Reg("score ~ age + tx", pl.from_pandas(simpleData))
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    with pytest.raises(TypeError, match="'data' must be"):
+        Reg("score ~ age + tx", {'score': [1]})
+
+
+def test_read_parquet(simpleData, tmp_path):
+    """Does read_parquet() read just the formula columns, as dictionaries?"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "data.parquet"
+    pq.write_table(pa.Table.from_pandas(simpleData, preserve_index=False),
+                   path, row_group_size=2)
+    table = DataSource.read_parquet(path, "score ~ age + tx")
+    assert table.column_names == ['score', 'age', 'tx']
+    assert pa.types.is_dictionary(table.column('tx').type)
+    r0 = Reg("score ~ age + tx", simpleData)
+    r0.fit()
+    r = Reg("score ~ age + tx", table)
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    reader = DataSource.read_parquet(path, "score ~ age + tx", stream=True)
+    assert isinstance(reader, pa.RecordBatchReader)
+    assert [b.num_rows for b in reader] == [2, 2, 1]
+    reader = DataSource.read_parquet(path, "score ~ age + tx", stream=True)
+    r = Reg("score ~ age + tx", reader)
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    table = DataSource.read_parquet(path, "score ~ tx", row_groups=[0, 2])
+    assert table.column('score').to_pylist() == [45.0, 52.0, 60.0]
+
+
+def test_unsigned_dictionary(simpleData):
+    """Do dictionaries with unsigned indices (Polars Categorical) work?"""
+    r0 = Reg("score ~ age + male", simpleData)
+    r0.fit()
+    table = pa.Table.from_pandas(simpleData, preserve_index=False)
+    table = table.set_column(1, 'male', table.column('male').cast(
+        pa.dictionary(pa.uint8(), pa.string())))
+    r = Reg("score ~ age + male", table)
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    pl = pytest.importorskip("polars")
+    df = pl.from_pandas(simpleData).with_columns(
+        pl.col('male').cast(pl.Categorical))
+    r = Reg("score ~ age + male", df)
+    r.fit()
+    assert np.allclose(r.bhat.values, r0.bhat.values)
+    with pytest.raises(TypeError, match="'data' must be"):
+        Reg("score ~ age + male", df.lazy())
+
+
+def test_numeric_rule_matches(simpleData):
+    """Do pandas and Arrow agree on which columns are numeric?"""
+    dat = simpleData.astype({'age': 'int32', 'score': 'float32'})
+    dat['flag'] = [True, False, True, False, True]
+    table = pa.Table.from_pandas(dat, preserve_index=False)
+    for var in ['age', 'score', 'male', 'flag']:
+        assert DataSource.is_numeric(dat, var) == \
+            DataSource.is_numeric(table, var)
+    dm = DesignMat("score ~ age + flag", dat)
+    dm.make_X()
+    da = DesignMat("score ~ age + flag", table)
+    da.make_X()
+    assert dm.X.shape == (5, 3)
+    assert np.array_equal(da.X, dm.X)
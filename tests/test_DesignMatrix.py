@@ -102,6 +102,71 @@ def test_custom_baselines(simpleData):
     assert dm.baselines['tx'] == 'P'
 
 
+@pytest.fixture(scope="module")
+def naData():
+    """ data frame fixture with missing values """
+    dat = pd.DataFrame({'age': [25, 30, np.nan, 40, 45, 50],
+                        'male': ['m', None, 'f', 'F', 'M', np.nan],
+                        'score': [45, 52, 88, 51, np.nan, 60]})
+    return(dat)
+
+
+def test_na_complete(naData):
+    """Are rows with any missing value dropped by default?"""
+    dm = DesignMat("score ~ age + male", naData)
+    dm.make_X()
+    assert dm.X.shape == (2, 3)
+    assert dm.n_dropped == 4
+    assert list(dm.dropped_index) == [1, 2, 4, 5]
+    assert list(dm.y) == [45, 51]
+    assert dm.levels == {'male': ['M']}
+
+
+def test_na_error(naData):
+    """Does na_action 'error' report the missing values?"""
+    dm = DesignMat("score ~ age + male", naData, na_action='error')
+    with pytest.raises(ValueError, match="'age' \\(1\\)"):
+        dm.make_X()
+    with pytest.raises(ValueError, match="must be one of"):
+        dm.set_na_action('drop')
+
+
+def test_na_level(naData):
+    """Are missing factor values coded as level 'NAN'?"""
+    dm = DesignMat("score ~ age + male", naData)
+    dm.set_na_action('level')
+    dm.make_X()
+    assert list(dm.dropped_index) == [2, 4]
+    assert dm.levels == {'male': ['M', 'NAN']}
+    assert dm.X[:, 3].tolist() == [0, 1, 0, 1]
+
+
+def test_na_level_case(naData):
+    """Does the missing value level follow the case settings?"""
+    dm = DesignMat("score ~ male", naData, na_action='level')
+    dm.set_toupper(False)
+    dm.make_X()
+    assert dm.baselines['male'] == 'F'
+    assert dm.levels['male'] == ['f', 'm', 'nan']
+
+
+def test_recode_before_make_X(simpleData):
+    """Does recode() work without a prior make_X()?"""
+    dm = DesignMat("score ~ age + male", simpleData)
+    assert dm.recode('male').tolist() == [[1], [1], [0], [0]]
+    assert dm.recode('age')[:, 0].tolist() == [25, 30, 35, 40]
+
+
+def test_recode_new_mask(naData):
+    """Does recode() on its own follow a changed na_action?"""
+    dm = DesignMat("score ~ age + male", naData)
+    assert dm.recode('male').shape == (2, 1)
+    dm.set_na_action('level')
+    assert dm.recode('male').shape == (4, 2)
+    dm.make_X()
+    assert dm.recode('male').tolist() == dm.X[:, 2:].tolist()
+
+
 @pytest.mark.skip(reason="not yet implemented")
 def test_explicit_substitute(simpleData):
     dm = DesignMat("score ~ age + male", simpleData)
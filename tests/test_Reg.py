@@ -44,3 +44,18 @@ def test_fit_correct(simpleData):
     assert r.df == 1
     assert all(r.residual.round(2) == (-11.0, 11.0, 11.0, -11.0))
     assert r.se_residual == approx(22.0)
+
+
+def test_fit_na(simpleData):
+    """Does fit() drop rows with missing values and record them?"""
+    dat = pd.concat((simpleData,
+                     pd.DataFrame({'age': [50.0], 'male': ['f'],
+                                   'score': [np.nan]})),
+                    ignore_index=True)
+    r = Reg("score ~ age + male", dat)
+    r.fit()
+    assert r.nobs == 4
+    assert r.n_dropped == 1
+    assert list(r.dropped_index) == [4]
+    assert all(round(r.bhat['estimate'], 1) == (182.0, -3.0, -51.0))
+    assert r.df == 1
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Unit testing of save_model() / load_model()
+@author: hseltman
+"""
+
+import os
+import pytest
+from pytest import approx
+import pandas as pd
+import numpy as np
+from demoReg.Reg import Reg
+from demoReg.RegIO import load_model, FittedModel
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    """ fitted Reg fixture """
+    dat = pd.DataFrame({'age': [25, 30, 35, 40, 45],
+                        'male': ['m', 'M', 'f', 'F', 'f'],
+                        'score': [45, 52, 88, 51, 60]})
+    r = Reg("score ~ age + male", dat)
+    r.fit()
+    return r
+
+
+def test_round_trip(fitted, tmp_path):
+    """Does a loaded model reproduce the fitted coefficients?"""
+    path = tmp_path / "model.bin"
+    fitted.save(path)
+    m = load_model(path)
+    assert isinstance(m, FittedModel)
+    assert m.IVs == ['age', 'male']
+    assert m.levels == {'male': ['M']}
+    assert m.baselines == {'male': 'F'}
+    assert m.X is None
+    assert list(m.bhat.index) == list(fitted.bhat.index)
+    assert np.allclose(m.bhat.values, fitted.bhat.values)
+    assert np.allclose(m.vcov, fitted.vcov)
+    assert m.se_residual == approx(fitted.se_residual)
+
+
+def test_optional_arrays(fitted, tmp_path):
+    """Are requested arrays saved and memory-mapped read-only?"""
+    path = tmp_path / "model.bin"
+    fitted.save(path, arrays=('X', 'residual'))
+    m = load_model(path)
+    assert np.array_equal(m.X, fitted.X)
+    assert np.allclose(m.residual, fitted.residual)
+    assert m.fitted is None
+    assert not m.X.flags.writeable
+    m2 = load_model(path, use_mmap=False)
+    assert np.array_equal(m2.X, fitted.X)
+
+
+def test_overwrite_while_mapped(fitted, tmp_path):
+    """Does saving over a mapped model leave the loaded copy intact?"""
+    path = tmp_path / "model.bin"
+    fitted.save(path, arrays='X')
+    m = load_model(path)
+    estimate = m.estimate.copy()
+    r = Reg("score ~ age", fitted.data)
+    r.fit()
+    r.save(path)
+    assert np.array_equal(m.estimate, estimate)
+    assert np.array_equal(m.X, fitted.X)
+    assert load_model(path).p == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["model.bin"]
+
+
+def test_file_mode(fitted, tmp_path):
+    """Is a saved model readable like any other new file?"""
+    path = tmp_path / "model.bin"
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"")
+    fitted.save(path)
+    assert path.stat().st_mode & 0o777 == other.stat().st_mode & 0o777
+    os.chmod(path, 0o640)
+    fitted.save(path)
+    assert path.stat().st_mode & 0o777 == 0o640
+
+
+def test_predict(fitted, tmp_path):
+    """Does predict() match the training fitted values?"""
+    path = tmp_path / "model.bin"
+    fitted.save(path)
+    m = load_model(path)
+    assert np.allclose(m.predict(fitted.data), fitted.fitted)
+
+
+def test_predict_missing(fitted, tmp_path):
+    """Are rows with missing or unseen values predicted as NaN?"""
+    path = tmp_path / "model.bin"
+    fitted.save(path)
+    m = load_model(path)
+    new = pd.DataFrame({'age': [20, np.nan, 30, 40],
+                        'male': ['m', 'f', None, 'x']})
+    pred = m.predict(new)
+    assert pred[0] == pytest.approx(m.predict(new.iloc[:1])[0])
+    assert not np.isnan(pred[0])
+    assert np.isnan(pred[1:]).all()
+    new = pd.DataFrame({'age': pd.array([20, None], dtype="Int64"),
+                        'male': ['m', 'f']})
+    assert np.isnan(m.predict(new)).tolist() == [False, True]
+    dat = fitted.data.copy()
+    dat.loc[4, 'male'] = None
+    r = Reg("score ~ age + male", dat, na_action='level')
+    r.fit()
+    r.save(path)
+    m = load_model(path)
+    assert m.levels == {'male': ['M', 'NAN']}
+    assert np.allclose(m.predict(dat), r.fitted)
+
+
+def test_bad_file(tmp_path):
+    """Does a non-model file raise an exception?"""
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"not a model file at all")
+    with pytest.raises(ValueError, match="not a demoReg model file"):
+        load_model(path)